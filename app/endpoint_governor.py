@@ -0,0 +1,270 @@
+import os
+import math
+import time
+import threading
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+load_dotenv(dotenv_path=".env")
+
+# Circuit breaker states
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Call types with separate latency statistics
+QUERY = "query"
+SHAPE = "shape"
+
+
+class EndpointUnavailable(Exception):
+    """Raised when the governor rejects a call (circuit open or load shed)."""
+
+
+class _Slot:
+    """Handle for a single in-flight call. Lets the caller flag an overload response."""
+
+    def __init__(self):
+        self.overloaded = False
+
+    def mark_overloaded(self):
+        self.overloaded = True
+
+
+class EndpointGovernor:
+    """
+    Shared governor for a remote SPARQL endpoint.
+
+    Combines three mechanisms:
+    - AIMD concurrency limit: the number of concurrent calls grows by one after
+      a window of healthy calls and is halved at most once per window on
+      failures or slow responses.
+    - Latency-based load shedding: callers wait for a free slot only as long as
+      the expected queueing delay fits into the wait budget, otherwise they are
+      rejected immediately.
+    - Circuit breaker: after consecutive failures all calls are rejected for a
+      cool-down period, then a single probe call decides whether to close again.
+
+    Latency is tracked per call type (single queries vs. whole shape runs),
+    each with its own latency target.
+    """
+
+    def __init__(self, name, min_limit=1, max_limit=8, initial_limit=4,
+                 latency_targets=None, max_queue_wait=2.0,
+                 failure_threshold=5, reset_timeout=30.0, timeout=30.0):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_targets = latency_targets or {QUERY: 5.0, SHAPE: 60.0}
+        self.max_queue_wait = max_queue_wait
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.timeout = timeout
+
+        self._limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self._in_flight = 0
+        self._waiting = 0
+        self._latency_ewma = {}
+        self._last_decrease_at = float("-inf")
+        self._consecutive_failures = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._cond = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def state(self) -> str:
+        with self._cond:
+            self._refresh_state()
+            return self._state
+
+    def is_open(self) -> bool:
+        """True if calls are currently rejected by the circuit breaker."""
+        return self.state == OPEN
+
+    def _refresh_state(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            print(f"[INFO] Circuit for {self.name} half-open, allowing a probe request")
+            self._state = HALF_OPEN
+            self._probe_in_flight = False
+
+    def _acquire(self, kind) -> bool:
+        """Reserves a slot. Returns True if the slot is the half-open probe."""
+        with self._cond:
+            self._refresh_state()
+
+            if self._state == OPEN:
+                raise EndpointUnavailable(f"Circuit for {self.name} is open")
+
+            if self._state == HALF_OPEN:
+                if self._probe_in_flight:
+                    raise EndpointUnavailable(f"Circuit for {self.name} is half-open, probe in flight")
+                self._probe_in_flight = True
+                self._in_flight += 1
+                return True
+
+            if self._in_flight >= self.limit:
+                # Shed immediately if the expected wait does not fit into the budget
+                expected_wait = self._latency_ewma.get(kind, 0.0) * (self._waiting + 1) / self.limit
+                if expected_wait > self.max_queue_wait:
+                    raise EndpointUnavailable(
+                        f"Load shed for {self.name}: expected wait {expected_wait:.2f}s"
+                    )
+
+                deadline = time.monotonic() + self.max_queue_wait
+                self._waiting += 1
+                try:
+                    while self._in_flight >= self.limit:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            raise EndpointUnavailable(
+                                f"Load shed for {self.name}: no free slot after {self.max_queue_wait:.2f}s"
+                            )
+                        self._cond.wait(remaining)
+                        self._refresh_state()
+                        if self._state != CLOSED:
+                            raise EndpointUnavailable(f"Circuit for {self.name} is {self._state}")
+                finally:
+                    self._waiting -= 1
+
+            self._in_flight += 1
+            return False
+
+    def _release(self, kind, started_at, latency, success, probe):
+        with self._cond:
+            # Whether the limit was actually in use while this call ran
+            at_limit = self._in_flight >= self.limit
+            self._in_flight -= 1
+
+            if latency is not None:
+                ewma = self._latency_ewma.get(kind)
+                self._latency_ewma[kind] = latency if ewma is None else 0.8 * ewma + 0.2 * latency
+
+            target = self.latency_targets.get(kind, self.latency_targets[QUERY])
+            slow = latency is not None and latency > target
+
+            if probe:
+                # Only the probe moves the breaker out of half-open
+                if success:
+                    print(f"[INFO] Probe succeeded, closing circuit for {self.name}")
+                    self._state = CLOSED
+                    self._consecutive_failures = 0
+                else:
+                    print(f"[WARNING] Probe failed, reopening circuit for {self.name}")
+                    self._state = OPEN
+                    self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+            elif self._state == CLOSED:
+                # While open or half-open, late results of calls started
+                # before the circuit opened are ignored
+                if success:
+                    self._consecutive_failures = 0
+                else:
+                    self._consecutive_failures += 1
+                if self._consecutive_failures >= self.failure_threshold:
+                    print(f"[WARNING] Opening circuit for {self.name} "
+                          f"after {self._consecutive_failures} consecutive failure(s)")
+                    self._state = OPEN
+                    self._opened_at = time.monotonic()
+                    self._probe_in_flight = False
+
+            if success and not slow:
+                # Additive increase: one extra slot per window of healthy calls,
+                # only while the limit is the bottleneck
+                if at_limit:
+                    self._limit = min(self.max_limit, self._limit + 1.0 / max(self._limit, 1.0))
+            elif started_at > self._last_decrease_at:
+                # Multiplicative decrease, once per window: calls started before
+                # the last decrease were already accounted for by it
+                self._limit = max(self.min_limit, self._limit / 2)
+                self._last_decrease_at = time.monotonic()
+
+            self._cond.notify_all()
+
+    def _release_neutral(self, probe):
+        with self._cond:
+            self._in_flight -= 1
+            if probe:
+                # Let the next call probe the endpoint instead
+                self._probe_in_flight = False
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, kind=QUERY, failure_types=(Exception,)):
+        """
+        Context manager guarding a single call to the endpoint.
+
+        Args:
+            kind (str): Call type, selects the latency statistics and target.
+            failure_types (tuple): Exceptions that count as endpoint failures.
+                Other exceptions release the slot without affecting the
+                breaker or the limit.
+
+        Raises:
+            EndpointUnavailable: If the circuit is open or the call is shed.
+
+        Exceptions raised inside the block are re-raised.
+        """
+        probe = self._acquire(kind)
+        handle = _Slot()
+        start = time.monotonic()
+        # Counts as a failure unless the block completes normally
+        success = False
+        try:
+            yield handle
+            success = not handle.overloaded
+        except failure_types:
+            raise
+        except Exception:
+            # Not an endpoint problem: release without judging the endpoint
+            success = None
+            raise
+        finally:
+            if success is None:
+                self._release_neutral(probe)
+            else:
+                self._release(kind, start, time.monotonic() - start, success, probe)
+
+
+_governors = {}
+_governors_lock = threading.Lock()
+
+
+def get_governor(endpoint_url) -> EndpointGovernor:
+    """
+    Returns the process-wide governor for the given endpoint URL, creating it on first use.
+    Limits are read from the environment.
+
+    State is not shared between processes. The concurrency limits are totals for
+    the whole service and are split evenly across the WEB_CONCURRENCY worker
+    processes (the variable uvicorn reads for its number of workers).
+    """
+    with _governors_lock:
+        governor = _governors.get(endpoint_url)
+        if governor is None:
+            processes = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+            min_limit = int(os.getenv("ENDPOINT_MIN_CONCURRENCY", "1"))
+
+            def per_process(total):
+                return max(min_limit, math.ceil(total / processes))
+
+            governor = EndpointGovernor(
+                endpoint_url,
+                min_limit=min_limit,
+                max_limit=per_process(int(os.getenv("ENDPOINT_MAX_CONCURRENCY", "8"))),
+                initial_limit=per_process(int(os.getenv("ENDPOINT_INITIAL_CONCURRENCY", "4"))),
+                latency_targets={
+                    QUERY: float(os.getenv("ENDPOINT_LATENCY_TARGET", "5.0")),
+                    SHAPE: float(os.getenv("SHAPE_LATENCY_TARGET", "60.0")),
+                },
+                max_queue_wait=float(os.getenv("ENDPOINT_MAX_QUEUE_WAIT", "2.0")),
+                failure_threshold=int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5")),
+                reset_timeout=float(os.getenv("BREAKER_RESET_TIMEOUT", "30.0")),
+                timeout=float(os.getenv("ENDPOINT_TIMEOUT", "30.0")),
+            )
+            _governors[endpoint_url] = governor
+        return governor
@@ -0,0 +1,266 @@
+"""
+Offline evaluation runner.
+
+Runs question sets through the pipeline in-process with a worker pool and
+stores the generated queries in the `responses` table of an SQLite database.
+
+Usage:
+    python -m app.evaluate dataset/questions.yml --workers 4
+"""
+import os
+import json
+import math
+import time
+import sqlite3
+import argparse
+import traceback
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import yaml
+from dotenv import load_dotenv
+from app.pipeline import answer_question
+from app.llm_query_generator import FALLBACK_PREFIX
+from app.utility import Utils
+
+load_dotenv(dotenv_path=".env")
+
+STAGES = ["translation", "entity_extraction", "shape_generation", "sparql_generation", "total"]
+
+
+def load_questions(questions_path, dataset=None, languages=None):
+    """
+    Loads a question set file and flattens it into (dataset, question) pairs.
+
+    Args:
+        questions_path (str): Path to a YAML question set (see dataset/questions.yml).
+        dataset (str, optional): Dataset URL overriding the one given in the file.
+        languages (list[str], optional): Only keep questions in these languages.
+
+    Returns:
+        list[tuple[str, str]]: The (dataset, question) pairs, one per language variant.
+    """
+    with open(questions_path, "r", encoding="utf-8") as f:
+        data = yaml.safe_load(f) or {}
+
+    dataset = dataset or (data.get("dataset") or {}).get("id")
+    if not dataset:
+        raise ValueError(f"No dataset given for question set: {questions_path}")
+    Utils.is_local_graph(dataset)  # Raises on unknown datasets
+
+    pairs = []
+    for entry in data.get("questions") or []:
+        for lang, text in (entry.get("question") or {}).items():
+            if languages and lang not in languages:
+                continue
+            if text:
+                pairs.append((dataset, text.strip()))
+    return pairs
+
+
+def init_db(db_path):
+    """Opens the responses database, creating the responses table if needed."""
+    connection = sqlite3.connect(db_path)
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS responses (
+            id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
+            time VARCHAR,
+            endpoint VARCHAR,
+            dataset VARCHAR,
+            question VARCHAR,
+            response VARCHAR,
+            exception VARCHAR
+        )
+    """)
+    connection.commit()
+    return connection
+
+
+def answered_questions(connection, endpoint):
+    """Returns the (dataset, question) pairs already answered without exception for the endpoint."""
+    rows = connection.execute(
+        "SELECT dataset, question FROM responses "
+        "WHERE endpoint = ? AND response IS NOT NULL AND exception IS NULL",
+        (endpoint,),
+    )
+    return set(rows)
+
+
+def run_question(dataset, question):
+    """
+    Answers a single question and returns the row values, stage timings and
+    degraded stages. Exceptions are caught and stored instead of aborting the
+    run. If SPARQL generation gave up after all retries or the answer is
+    degraded (empty shape, syntax-only validation), this is stored as exception
+    so the question is retried on resume.
+    """
+    timings = {}
+    response = None
+    exception = None
+    degraded = []
+
+    start = time.perf_counter()
+    try:
+        result = answer_question(question, dataset, timings=timings)
+        response = json.dumps({
+            "dataset": dataset,
+            "question": question,
+            "query": result["sparql_query"],
+        }, ensure_ascii=False)
+        query_result = result["query_result"]
+        if isinstance(query_result, str) and query_result.startswith(FALLBACK_PREFIX):
+            exception = f"SPARQL generation failed: {query_result}"
+        elif result["degraded"]:
+            degraded = result["degraded"]
+            exception = f"Degraded answer: {', '.join(degraded)}"
+    except Exception:
+        exception = traceback.format_exc()
+    timings["total"] = time.perf_counter() - start
+
+    row = (str(datetime.now(timezone.utc)), dataset, question, response, exception)
+    return row, timings, degraded
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of a list of values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, math.ceil(p / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def print_report(stage_timings, completed, failed, degraded, elapsed):
+    """Prints throughput and per-stage latency percentiles."""
+    throughput = completed / elapsed if elapsed > 0 else 0.0
+    print(f"\n[INFO] Answered {completed} question(s) ({failed} failed, {degraded} degraded) in {elapsed:.2f}s "
+          f"({throughput:.2f} questions/s)")
+    print(f"{'stage':<20}{'n':>6}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}")
+    for stage in STAGES:
+        values = stage_timings.get(stage, [])
+        if not values:
+            continue
+        p50, p90, p99 = (percentile(values, p) for p in (50, 90, 99))
+        print(f"{stage:<20}{len(values):>6}{p50:>9.2f}s{p90:>9.2f}s{p99:>9.2f}s{max(values):>9.2f}s")
+
+
+def run_evaluation(questions_paths, db_path, endpoint, workers, batch_size,
+                   dataset=None, languages=None, resume=True):
+    """
+    Runs all questions through the pipeline with a worker pool and writes the
+    results to the responses table in batches.
+
+    Returns:
+        dict: Lists of timings in seconds per stage.
+    """
+    questions = []
+    for path in questions_paths:
+        questions.extend(load_questions(path, dataset, languages))
+    # Drop duplicates while keeping order
+    questions = list(dict.fromkeys(questions))
+
+    connection = init_db(db_path)
+    if resume:
+        done = answered_questions(connection, endpoint)
+        skipped = len([q for q in questions if q in done])
+        questions = [q for q in questions if q not in done]
+        print(f"[INFO] Skipping {skipped} question(s) already answered in {db_path}")
+
+    print(f"[INFO] Running {len(questions)} question(s) with {workers} worker(s)")
+
+    stage_timings = {stage: [] for stage in STAGES}
+    batch = []
+    counts = {"completed": 0, "failed": 0, "degraded": 0}
+    insert = ("INSERT INTO responses (time, endpoint, dataset, question, response, exception) "
+              "VALUES (?, ?, ?, ?, ?, ?)")
+
+    def flush():
+        if batch:
+            connection.executemany(insert, batch)
+            connection.commit()
+            batch.clear()
+
+    def collect(future):
+        (row_time, ds, question, response, exception), timings, degraded = future.result()
+        batch.append((row_time, endpoint, ds, question, response, exception))
+        for stage, duration in timings.items():
+            stage_timings.setdefault(stage, []).append(duration)
+
+        counts["completed"] += 1
+        progress = f"[{counts['completed']}/{len(questions)}] {question}"
+        if degraded:
+            counts["degraded"] += 1
+            print(f"⚠️ {progress} (degraded: {', '.join(degraded)})")
+        elif exception:
+            counts["failed"] += 1
+            print(f"❌ {progress}")
+        else:
+            print(f"✅ {progress} ({timings['total']:.2f}s)")
+
+        if len(batch) >= batch_size:
+            flush()
+
+    start = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=workers)
+    futures = [executor.submit(run_question, ds, q) for ds, q in questions]
+    collected = set()
+    try:
+        try:
+            for future in as_completed(futures):
+                collected.add(future)
+                collect(future)
+        except KeyboardInterrupt:
+            # Drop queued questions, but keep the answers of those already running:
+            # the interpreter waits for their threads before exiting anyway
+            executor.shutdown(wait=False, cancel_futures=True)
+            running = [f for f in futures if f not in collected and not f.cancelled()]
+            print(f"[WARNING] Run interrupted, cancelled queued questions. Collecting "
+                  f"{len(running)} started question(s), press Ctrl-C again to stop waiting.")
+            for future in as_completed(running):
+                collect(future)
+            raise
+        except BaseException:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        else:
+            executor.shutdown()
+    finally:
+        # Keep the answers collected so far
+        flush()
+        connection.close()
+
+    print_report(stage_timings, counts["completed"], counts["failed"], counts["degraded"],
+                 time.perf_counter() - start)
+    return stage_timings
+
+def main():
+    parser = argparse.ArgumentParser(description="Run question sets through the pipeline and store the results in SQLite.")
+    parser.add_argument("questions", nargs="+", help="YAML question set file(s)")
+    parser.add_argument("--db", default=os.getenv("EVALUATION_DB", "dataset/responses.db"),
+                        help="SQLite database with the responses table")
+    parser.add_argument("--endpoint", default="in-process",
+                        help="Value stored in the endpoint column, also used to find answered questions")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("EVALUATION_WORKERS", "4")),
+                        help="Number of questions processed concurrently")
+    parser.add_argument("--batch-size", type=int, default=20, help="Number of rows per database commit")
+    parser.add_argument("--dataset", help="Dataset URL overriding the one in the question set")
+    parser.add_argument("--languages", nargs="+", help="Only run questions in these languages (e.g. en de)")
+    parser.add_argument("--no-resume", action="store_true", help="Also rerun questions already answered")
+    args = parser.parse_args()
+
+    if args.workers < 1 or args.batch_size < 1:
+        parser.error("--workers and --batch-size must be at least 1")
+
+    run_evaluation(
+        args.questions,
+        args.db,
+        args.endpoint,
+        args.workers,
+        args.batch_size,
+        dataset=args.dataset,
+        languages=args.languages,
+        resume=not args.no_resume,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,9 @@ from app.utility import Utils
 # Load environment variables
 load_dotenv(dotenv_path=".env")
 
+# Prefix of the query result returned when no valid query could be generated
+FALLBACK_PREFIX = "# Failed to generate SPARQL query"
+
 def generate_sparql_query(question, shape, dataset):
     """
     Generates a SPARQL query from a natural language question and shape description.
@@ -113,7 +116,7 @@ def generate_sparql_query(question, shape, dataset):
 
     print(f"[WARNING] Failed to generate a valid SPARQL query after {retry_count} retries. Skipping...")
 
-    fallback_info = (f"# Failed to generate SPARQL query for question: {question}# Attempts: {retry_count}")
+    fallback_info = (f"{FALLBACK_PREFIX} for question: {question}# Attempts: {retry_count}")
     
     print(f"⚠️ Fallback information: {fallback_info}")
     print(f"❌ Last response: {last_response}")
@@ -1,10 +1,6 @@
 from fastapi import FastAPI, HTTPException
-from app.entity_extraction import extract_entities
-from app.shape_generation import generate_shape
-from app.llm_query_generator import generate_sparql_query
+from app.pipeline import answer_question
 from app.capture_questions import capture_results
-from app.translate import translate_question
-from app.utility import Utils
 
 # Known datasets for validation
 KNOWN_DATASETS = [
@@ -19,32 +15,19 @@ app = FastAPI(
     version="0.1.0",
 )
 
+# Sync handler: FastAPI runs it in its threadpool, so requests are processed
+# concurrently instead of blocking the event loop
 @app.get("/")
-async def get_answer(question: str, dataset: str):
+def get_answer(question: str, dataset: str):
     if dataset not in KNOWN_DATASETS:
         raise HTTPException(status_code=404, detail="Unknown dataset")
 
     original_question = question
 
-    # Translate the original_question to ensure it is in the correct format
-    english_question = translate_question(original_question)
-    print(f"[INFO] Original question: {original_question}")
-    print(f"[INFO] Translated question: {english_question}")
-    
-    # Extract entities if the dataset is not a local graph
-    entities = None
-    if not Utils.is_local_graph(dataset):
-        entities = extract_entities(english_question)
-    print(f"[INFO] Extracted entities: {entities}")
-    
-    # Generate the ShEx shape based on the entities and dataset
-    shape = generate_shape(entities, dataset)
-    # print(f"[INFO] Generated shape: {shape}")
-    
-    # Generate the SPARQL query using the english_question, shape, and dataset
-    sparql_query, query_result = generate_sparql_query(english_question, shape, dataset)
-    
-    capture_results(original_question, dataset, entities, sparql_query, query_result)
+    result = answer_question(original_question, dataset)
+    sparql_query = result["sparql_query"]
+
+    capture_results(original_question, dataset, result["entities"], sparql_query, result["query_result"])
     
     # Return the response with the dataset, question, and generated query
     return {
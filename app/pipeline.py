@@ -0,0 +1,65 @@
+import time
+from app.entity_extraction import extract_entities
+from app.shape_generation import generate_shape
+from app.llm_query_generator import generate_sparql_query
+from app.translate import translate_question
+from app.utility import Utils
+
+
+def answer_question(question, dataset, timings=None):
+    """
+    Runs the full question answering pipeline: translation, entity extraction,
+    shape generation and SPARQL generation.
+
+    Args:
+        question (str): The natural language question.
+        dataset (str): The dataset URL.
+        timings (dict, optional): If given, filled with the duration in seconds of each stage.
+
+    Returns:
+        dict: The english question, extracted entities, shape, SPARQL query, query result
+            and a list of degraded stages (empty shape, syntax-only validation).
+    """
+    if timings is None:
+        timings = {}
+
+    # Translate the question to ensure it is in the correct format
+    start = time.perf_counter()
+    english_question = translate_question(question)
+    timings["translation"] = time.perf_counter() - start
+    print(f"[INFO] Original question: {question}")
+    print(f"[INFO] Translated question: {english_question}")
+
+    # Extract entities if the dataset is not a local graph
+    start = time.perf_counter()
+    entities = None
+    if not Utils.is_local_graph(dataset):
+        entities = extract_entities(english_question)
+    timings["entity_extraction"] = time.perf_counter() - start
+    print(f"[INFO] Extracted entities: {entities}")
+
+    # Generate the ShEx shape based on the entities and dataset
+    start = time.perf_counter()
+    shape = generate_shape(entities, dataset)
+    timings["shape_generation"] = time.perf_counter() - start
+
+    # Generate the SPARQL query using the english_question, shape, and dataset
+    start = time.perf_counter()
+    sparql_query, query_result = generate_sparql_query(english_question, shape, dataset)
+    timings["sparql_generation"] = time.perf_counter() - start
+
+    # Answers produced while the endpoint was unavailable or shape generation failed
+    degraded = []
+    if not shape:
+        degraded.append("empty shape")
+    if query_result == [Utils.SYNTAX_ONLY_RESULT]:
+        degraded.append("syntax-only validation")
+
+    return {
+        "english_question": english_question,
+        "entities": entities,
+        "shape": shape,
+        "sparql_query": sparql_query,
+        "query_result": query_result,
+        "degraded": degraded,
+    }
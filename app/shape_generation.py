@@ -1,10 +1,48 @@
 import os
+import threading
+from collections import OrderedDict
+from http.client import HTTPException
 from shexer.shaper import Shaper
+from SPARQLWrapper.SPARQLExceptions import SPARQLWrapperException
 from app.utility import Utils
+from app.endpoint_governor import get_governor, EndpointUnavailable, SHAPE
 from dotenv import load_dotenv
 
 load_dotenv(dotenv_path=".env")
 
+# Last successfully generated shapes per entity set, served while the endpoint is unavailable
+SHAPE_CACHE_SIZE = int(os.getenv("SHAPE_CACHE_SIZE", "256"))
+_shape_cache = OrderedDict()
+_shape_cache_lock = threading.Lock()
+
+# Errors raised by shexer's endpoint queries (urllib errors are OSErrors).
+# Anything else, e.g. a shape map shexer cannot handle, is not held against the endpoint.
+ENDPOINT_ERRORS = (OSError, HTTPException, SPARQLWrapperException)
+
+
+def _cache_key(entity_labels):
+    return tuple(sorted(entity_labels or []))
+
+
+def _cache_shape(entity_labels, shape):
+    with _shape_cache_lock:
+        key = _cache_key(entity_labels)
+        _shape_cache[key] = shape
+        _shape_cache.move_to_end(key)
+        while len(_shape_cache) > SHAPE_CACHE_SIZE:
+            _shape_cache.popitem(last=False)
+
+
+def _cached_shape(entity_labels):
+    """Returns the cached shape for the entity set, or an empty shape if none is cached."""
+    with _shape_cache_lock:
+        shape = _shape_cache.get(_cache_key(entity_labels))
+    if shape is None:
+        print(f"⚠️ No cached shape for {entity_labels}, continuing with an empty shape.")
+        return ""
+    print(f"⚠️ Using cached shape for {entity_labels}.")
+    return shape
+
 def generate_shape_from_local_graph(local_graph_location):
     """
     Loads all RDF files from a folder, generates ShEx shapes using Shexer,
@@ -53,9 +91,14 @@ def generate_shape_from_local_graph(local_graph_location):
 
 
 def generate_combined_shape(dbpedia_sparql_url, entity_labels):
+    """
+    Generates ShEx shapes for the given entities from the DBpedia endpoint.
+    While the endpoint governor rejects calls, a cached or empty shape is returned instead.
+    """
     print(f"Entity labels: {entity_labels}")
     shape_lines = []
-    
+    governor = get_governor(dbpedia_sparql_url)
+
     try:
         for label in entity_labels:
             label_clean = label.replace(' ', '_')
@@ -85,16 +128,23 @@ def generate_combined_shape(dbpedia_sparql_url, entity_labels):
             "http://shapes.dbpedia.org/": "shapes"
         }
 
+        # The shape map is parsed here, outside the governor slot
         shaper = Shaper(
             shape_map_raw=shape_map_raw,
             url_endpoint=dbpedia_sparql_url,
             namespaces_dict=namespaces_dict,
             disable_comments=True,
         )
-        shape = shaper.shex_graph(string_output=True)
+        # shexer offers no request timeout, the whole run is measured against SHAPE_LATENCY_TARGET
+        with governor.slot(kind=SHAPE, failure_types=ENDPOINT_ERRORS):
+            shape = shaper.shex_graph(string_output=True)
         print(f"✅ Shape generation successful: {shape}")
 
+        _cache_shape(entity_labels, shape)
         return shape
+    except EndpointUnavailable as e:
+        print(f"⚠️ {e}. Skipping shape generation.")
+        return _cached_shape(entity_labels)
     except Exception as e:
         print(f"Error generating ShEx graph: {e}")
         return None
@@ -2,10 +2,34 @@ import os
 import logging
 import requests
 from rdflib import Graph
+from rdflib.plugins.sparql import prepareQuery
 import warnings
+from app.endpoint_governor import get_governor, EndpointUnavailable
 
 
 class Utils:
+    # Result marker for queries that were only checked locally for syntax
+    SYNTAX_ONLY_RESULT = "[DEGRADED] Endpoint unavailable, query passed local syntax check"
+
+    # Prefixes predefined by the DBpedia endpoint, needed to parse queries locally
+    DBPEDIA_PREFIXES = {
+        "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+        "rdfs": "http://www.w3.org/2000/01/rdf-schema#",
+        "xsd": "http://www.w3.org/2001/XMLSchema#",
+        "owl": "http://www.w3.org/2002/07/owl#",
+        "foaf": "http://xmlns.com/foaf/0.1/",
+        "dct": "http://purl.org/dc/terms/",
+        "dcterms": "http://purl.org/dc/terms/",
+        "skos": "http://www.w3.org/2004/02/skos/core#",
+        "prov": "http://www.w3.org/ns/prov#",
+        "schema": "http://schema.org/",
+        "geo": "http://www.w3.org/2003/01/geo/wgs84_pos#",
+        "dbr": "http://dbpedia.org/resource/",
+        "dbo": "http://dbpedia.org/ontology/",
+        "dbp": "http://dbpedia.org/property/",
+        "yago": "http://dbpedia.org/class/yago/",
+    }
+
     @staticmethod
     def resolve_llm_provider(llm_provider: str) -> str:
         """Resolves the LLM provider to a specific string."""
@@ -47,6 +71,9 @@ class Utils:
             sparql_query: The SPARQL query string.
             endpoint_url: The URL of the SPARQL endpoint.
 
+        Calls go through the shared endpoint governor. If the endpoint is unavailable
+        (circuit open or load shed), the query is only checked locally for syntax.
+
         Returns:
             A list of result values (as strings), or a dictionary with {"error": "..."}.
         """
@@ -58,8 +85,14 @@ class Utils:
             "format": "json"
         }
 
+        governor = get_governor(endpoint_url)
+
         try:
-            response = requests.get(endpoint_url, headers=headers, params=data)
+            with governor.slot() as slot:
+                response = requests.get(endpoint_url, headers=headers, params=data, timeout=governor.timeout)
+                # Rate limiting and server errors signal an overloaded endpoint
+                if response.status_code == 429 or response.status_code >= 500:
+                    slot.mark_overloaded()
             response.raise_for_status()
             json_response = response.json()
 
@@ -73,9 +106,31 @@ class Utils:
                 if var in binding and "value" in binding[var]
             ]
 
+        except EndpointUnavailable as e:
+            print(f"[WARNING] {e}. Falling back to local syntax check.")
+            return Utils.check_sparql_syntax(sparql_query)
         except requests.exceptions.RequestException as e:
             return {"error": str(e)} 
 
+    @staticmethod
+    def check_sparql_syntax(sparql_query: str) -> list:
+        """
+        Parses a SPARQL query locally without executing it. Used as degraded
+        validation while the remote endpoint is unavailable.
+
+        Args:
+            sparql_query: The SPARQL query string.
+
+        Returns:
+            A single-element list marking the query as syntactically valid,
+            or a dictionary with {"error": "..."}.
+        """
+        try:
+            prepareQuery(sparql_query, initNs=Utils.DBPEDIA_PREFIXES)
+            return [Utils.SYNTAX_ONLY_RESULT]
+        except Exception as e:
+            return {"error": f"SPARQL syntax error: {e}"}
+
     @staticmethod
     def guess_rdf_format(file_path: str) -> str:
         """Guesses RDF serialization format based on file extension."""